@@ -12,6 +12,7 @@ class Settings(BaseModel):
     OPEN_SANCTIONS_API_KEY: str | None = os.getenv("OPEN_SANCTIONS_API_KEY") or None
     SANCTIONS_TOPK: int = int(os.getenv("SANCTIONS_TOPK", "5"))
     SANCTIONS_FLAG_THRESHOLD: float = float(os.getenv("SANCTIONS_FLAG_THRESHOLD", "0.85"))
+    SANCTIONS_CACHE_TTL: float = float(os.getenv("SANCTIONS_CACHE_TTL", "10800"))  # seconds; 0 disables
 
 
 @lru_cache
@@ -1,29 +1,29 @@
+import asyncio
 import io
 import os
 import re
 import tempfile
+from contextlib import asynccontextmanager
 from typing import Optional, Tuple, List
 
 import numpy as np
 from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Request
-from fastapi.responses import JSONResponse, HTMLResponse
+from fastapi.responses import JSONResponse, HTMLResponse, ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 
 from app.schemas import KycResult, ExtractedFields, Scores, SanctionsMatch
 from app.config import Settings, get_settings
+from app.scoring import aggregate, warmup as warmup_scoring
 from app.utils.image import read_upload_as_bgr, to_pil
 from app.services.ocr import extract_text_fields, try_mrz_parse
-from app.services.face import FaceService, cosine_similarity
+from app.services.face import FaceService, cosine_similarity_unit
 from app.services.liveness import liveness_heuristics
-from app.services.sanctions import query_opensanctions
+from app.services.sanctions import query_opensanctions, aclose_client
 
 settings: Settings = get_settings()
-app = FastAPI(title="KYC MVP", version="0.1.0")
 
-# Static demo form
-app.mount("/web", StaticFiles(directory="web", html=True), name="web")
 
-# Global model singletons (lazy init)
+# Global model singletons (lazy init, warmed up on startup)
 _face_service: Optional[FaceService] = None
 
 
@@ -34,6 +34,31 @@ def face_service() -> FaceService:
     return _face_service
 
 
+def _warm_face_service() -> None:
+    fs = face_service()
+    # Dummy pass so OpenCV's DNN backend is initialised before the first request
+    fs.detect_and_embed(np.zeros((64, 64, 3), dtype=np.uint8))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    warmup_scoring()
+    try:
+        await asyncio.to_thread(_warm_face_service)
+    except Exception as e:
+        # Don't block startup (e.g. offline model download); retried lazily per request
+        import sys
+        print(f"[WARN] Face model warm-up failed: {e}", file=sys.stderr)
+    yield
+    await aclose_client()
+
+
+app = FastAPI(title="KYC MVP", version="0.1.0", lifespan=lifespan, default_response_class=ORJSONResponse)
+
+# Static demo form
+app.mount("/web", StaticFiles(directory="web", html=True), name="web")
+
+
 @app.get("/", response_class=HTMLResponse)
 def root():
     return '<html><head><meta http-equiv="refresh" content="0; url=/web/index.html"></head><body></body></html>'
@@ -67,15 +92,31 @@ async def kyc_verify(
 ):
     # Read images
     try:
-        id_front_img = await read_upload_as_bgr(id_front)
-        selfie_img = await read_upload_as_bgr(selfie)
-        id_back_img = await read_upload_as_bgr(id_back) if id_back else None
+        id_front_img, selfie_img, id_back_img = await asyncio.gather(
+            read_upload_as_bgr(id_front),
+            read_upload_as_bgr(selfie),
+            read_upload_as_bgr(id_back),
+        )
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Invalid image upload: {e}")
 
-    # 1) OCR + MRZ
-    mrz_fields = try_mrz_parse(id_front_img)
-    ocr_fields, ocr_conf = extract_text_fields(id_front_img, id_back_img)
+    # 1-3) OCR + MRZ, face extraction and liveness are independent of each
+    # other, so run them concurrently on worker threads
+    fs = face_service()
+
+    (
+        mrz_fields,
+        (ocr_fields, ocr_conf),
+        (id_face_embed, id_face_bbox),
+        (selfie_embed, selfie_bbox),
+        live_score,
+    ) = await asyncio.gather(
+        asyncio.to_thread(try_mrz_parse, id_front_img),
+        extract_text_fields(id_front_img, id_back_img),
+        asyncio.to_thread(fs.detect_and_embed, id_front_img),
+        asyncio.to_thread(fs.detect_and_embed, selfie_img),
+        asyncio.to_thread(liveness_heuristics, selfie_img),
+    )
 
     extracted = ExtractedFields(
         full_name=mrz_fields.full_name or ocr_fields.full_name or full_name,
@@ -87,21 +128,13 @@ async def kyc_verify(
         source="mrz" if mrz_fields.document_number else "ocr",
     )
 
-    # 2) Face extraction and verification
-    fs = face_service()
-
-    id_face_embed, id_face_bbox = fs.detect_and_embed(id_front_img)
     if id_face_embed is None:
         raise HTTPException(status_code=422, detail="Could not detect a face on the ID image.")
 
-    selfie_embed, selfie_bbox = fs.detect_and_embed(selfie_img)
     if selfie_embed is None:
         raise HTTPException(status_code=422, detail="Could not detect a face on the selfie image.")
 
-    face_match_score = float(cosine_similarity(id_face_embed, selfie_embed))  # 0..1 approx
-
-    # 3) Basic liveness heuristic on selfie
-    live_score = liveness_heuristics(selfie_img)
+    face_match_score = cosine_similarity_unit(id_face_embed, selfie_embed)  # 0..1 approx
 
     # 4) Sanctions/PEP screening (OpenSanctions)
     sanctions_matches: List[SanctionsMatch] = []
@@ -109,11 +142,12 @@ async def kyc_verify(
     sanctions_flag = False
     try:
         if extracted.full_name:
-            sanctions_matches = query_opensanctions(
+            sanctions_matches = await query_opensanctions(
                 name=extracted.full_name,
                 birth_date=extracted.dob,
                 api_key=settings.OPEN_SANCTIONS_API_KEY,
                 top_k=5,
+                cache_ttl=settings.SANCTIONS_CACHE_TTL,
             )
             if len(sanctions_matches) > 0:
                 top = sanctions_matches[0]
@@ -125,16 +159,12 @@ async def kyc_verify(
         sanctions_flag = False
 
     # 5) Risk aggregation (toy scoring)
-    face_component = max(0.0, min(1.0, (face_match_score - settings.FACE_PASS_THRESHOLD + 0.2) / 0.2))
-    live_component = max(0.0, min(1.0, live_score))
-    ocr_component = max(0.0, min(1.0, ocr_conf))
-    sanctions_component = max(0.0, min(1.0, 1.0 - sanctions_score))
-
-    overall = (
-        0.55 * face_component
-        + 0.20 * live_component
-        + 0.15 * ocr_component
-        + 0.10 * sanctions_component
+    overall = aggregate(
+        float(face_match_score),
+        float(live_score),
+        float(ocr_conf),
+        float(sanctions_score),
+        float(settings.FACE_PASS_THRESHOLD),
     )
 
     passed = (
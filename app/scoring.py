@@ -0,0 +1,35 @@
+from app.utils.jit import njit
+
+
+@njit(cache=True, fastmath=True)
+def _clamp01(x: float) -> float:
+    if x < 0.0:
+        return 0.0
+    if x > 1.0:
+        return 1.0
+    return x
+
+
+@njit(cache=True, fastmath=True)
+def aggregate(face: float, live: float, ocr_conf: float, sanctions_score: float, face_thr: float) -> float:
+    """
+    Toy risk aggregation: weighted sum of per-signal components, each clamped to 0..1.
+    Returns the overall score.
+    """
+    face_component = _clamp01((face - face_thr + 0.2) / 0.2)
+    live_component = _clamp01(live)
+    ocr_component = _clamp01(ocr_conf)
+    sanctions_component = _clamp01(1.0 - sanctions_score)
+
+    overall = (
+        0.55 * face_component
+        + 0.20 * live_component
+        + 0.15 * ocr_component
+        + 0.10 * sanctions_component
+    )
+    return overall
+
+
+def warmup() -> None:
+    """Trigger JIT compilation so the first request doesn't pay for it."""
+    aggregate(0.5, 0.5, 0.5, 0.0, 0.35)
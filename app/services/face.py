@@ -1,10 +1,19 @@
-from typing import Optional, Tuple
+from typing import Optional, Sequence, Tuple
+import math
 import os
+import threading
 import cv2
 import numpy as np
 
+from app.utils.jit import njit, NUMBA_AVAILABLE
 from app.utils.models import ensure_model
 
+# Optional: SIMD-accelerated distance kernels; falls back to NumPy if missing
+try:
+    import simsimd
+except ImportError:  # pragma: no cover
+    simsimd = None
+
 # Correct raw URLs on the main branch (use raw.githubusercontent.com)
 DEFAULT_YUNET_URLS = [
     "https://raw.githubusercontent.com/opencv/opencv_zoo/main/models/face_detection_yunet/face_detection_yunet_2023mar.onnx",
@@ -23,6 +32,12 @@ ENV_SFACE_URL = os.getenv("SFACE_URL", "").strip()
 YUNET_FILE = os.getenv("YUNET_FILE", "face_detection_yunet_2023mar.onnx")
 SFACE_FILE = os.getenv("SFACE_FILE", "face_recognition_sface_2021dec.onnx")
 
+# Width of the SFace embedding vector
+SFACE_EMBED_DIM = 128
+
+# Long-edge size images are downscaled to before running the YuNet detector
+DETECT_MAX_SIDE = int(os.getenv("FACE_DETECT_MAX_SIDE", "1024"))
+
 
 class FaceService:
     """
@@ -42,40 +57,127 @@ class FaceService:
         )
         self.recognizer = cv2.FaceRecognizerSF_create(self.sface_path, "")
 
-    def detect_and_embed(self, img_bgr: np.ndarray) -> tuple[Optional[np.ndarray], Optional[tuple[int, int, int, int]]]:
+        # The OpenCV models keep per-call state (e.g. YuNet input size), so
+        # serialize access when called from several worker threads at once
+        self._detector_lock = threading.Lock()
+        self._recognizer_lock = threading.Lock()
+
+    def _detect_largest(self, img_bgr: np.ndarray) -> Optional[np.ndarray]:
         h, w = img_bgr.shape[:2]
+        # Detect on a downscaled copy of large images; coordinates are mapped
+        # back so alignment/recognition still use the full-resolution image
+        scale = min(1.0, DETECT_MAX_SIDE / float(max(h, w)))
+        det_img = img_bgr
+        if scale < 1.0:
+            w, h = max(1, int(w * scale)), max(1, int(h * scale))
+            det_img = cv2.resize(img_bgr, (w, h), interpolation=cv2.INTER_AREA)
+
         # YuNet requires setting the input size to the image size before detection
-        self.detector.setInputSize((w, h))
-        retval, faces = self.detector.detect(img_bgr)
+        with self._detector_lock:
+            self.detector.setInputSize((w, h))
+            retval, faces = self.detector.detect(det_img)
 
         if faces is None or len(faces) == 0:
-            return None, None
+            return None
+
+        # faces: Nx15, [x, y, w, h, 5 landmarks (x, y), score]; choose the largest by area
+        areas = faces[:, 2] * faces[:, 3]
+        face = faces[int(np.argmax(areas))].copy()
+        if scale < 1.0:
+            face[:14] /= scale
+        return face
+
+    def _raw_feature(self, img_bgr: np.ndarray, face: np.ndarray) -> np.ndarray:
+        # Align and extract feature (not normalized)
+        with self._recognizer_lock:
+            aligned = self.recognizer.alignCrop(img_bgr, face)
+            feat = self.recognizer.feature(aligned)  # returns a vector-like ndarray
+        return np.asarray(feat, dtype=np.float32).reshape(-1)
 
-        # faces: Nx15, [x, y, w, h, ...]; choose the largest by area
-        def _area(face_row):
-            x, y, fw, fh = face_row[:4]
-            return float(fw * fh)
-
-        faces_sorted = sorted(faces, key=_area, reverse=True)
-        face = faces_sorted[0]
+    def detect_and_embed(self, img_bgr: np.ndarray) -> tuple[Optional[np.ndarray], Optional[tuple[int, int, int, int]]]:
+        face = self._detect_largest(img_bgr)
+        if face is None:
+            return None, None
 
-        # Align and extract feature
-        aligned = self.recognizer.alignCrop(img_bgr, face)
-        feat = self.recognizer.feature(aligned)  # returns a vector-like ndarray
-        feat = np.asarray(feat, dtype=np.float32).reshape(-1)
-        norm = float(np.linalg.norm(feat))
+        feat = self._raw_feature(img_bgr, face)
+        norm = float(np.sqrt(np.vdot(feat, feat)))
         if norm < 1e-9:
             return None, None
-        emb = feat / (norm + 1e-9)
+        emb = feat / norm  # unit vector; see cosine_similarity_unit
 
         # Build bbox: [x, y, w, h] -> (x1, y1, x2, y2)
         x, y, fw, fh = face[:4]
         bbox = (int(x), int(y), int(x + fw), int(y + fh))
         return emb, bbox
 
+    def embed_gallery(self, imgs: Sequence[np.ndarray]) -> np.ndarray:
+        """
+        Embed the largest face of each image into one contiguous (N, D) float32
+        matrix of L2-normalized rows, so matching a query is a single GEMV
+        (see match_gallery). Images without a usable face get an all-zero row,
+        keeping row i aligned with imgs[i].
+        """
+        rows = []
+        for img in imgs:
+            face = self._detect_largest(img)
+            rows.append(self._raw_feature(img, face) if face is not None else None)
+
+        gallery = np.zeros((len(rows), SFACE_EMBED_DIM), dtype=np.float32)
+        for i, r in enumerate(rows):
+            if r is not None:
+                gallery[i] = r
+
+        norms = np.linalg.norm(gallery, axis=1, keepdims=True)
+        np.divide(gallery, norms, out=gallery, where=norms > 1e-9)
+        return gallery
+
+
+def match_gallery(gallery: np.ndarray, query: np.ndarray) -> np.ndarray:
+    """Cosine scores of a unit-norm query against every row of embed_gallery() output."""
+    return gallery @ np.ascontiguousarray(query, dtype=np.float32)
+
+
+@njit(cache=True, fastmath=True)
+def _cosine_nb(a: np.ndarray, b: np.ndarray) -> float:
+    # Single fused pass over both vectors (dot + both squared norms)
+    s = 0.0
+    na = 0.0
+    nb = 0.0
+    for i in range(a.shape[0]):
+        s += a[i] * b[i]
+        na += a[i] * a[i]
+        nb += b[i] * b[i]
+    return s / math.sqrt(na * nb + 1e-18)
+
 
 def cosine_similarity(a: np.ndarray, b: np.ndarray) -> float:
     if a is None or b is None:
         return 0.0
-    denom = (np.linalg.norm(a) * np.linalg.norm(b)) + 1e-9
-    return float(np.dot(a, b) / denom)
\ No newline at end of file
+    if simsimd is not None:
+        a32 = np.ascontiguousarray(a, dtype=np.float32)
+        b32 = np.ascontiguousarray(b, dtype=np.float32)
+        # simsimd returns the cosine *distance*
+        return 1.0 - float(simsimd.cosine(a32, b32))
+    if NUMBA_AVAILABLE:
+        return float(_cosine_nb(np.ascontiguousarray(a, dtype=np.float32),
+                                np.ascontiguousarray(b, dtype=np.float32)))
+    # One sqrt over the product of squared norms instead of two np.linalg.norm calls
+    ab = float(np.vdot(a, a) * np.vdot(b, b))
+    if ab <= 0.0:
+        return 0.0
+    return float(np.dot(a, b) / np.sqrt(ab))
+
+
+def cosine_similarity_unit(a: np.ndarray, b: np.ndarray) -> float:
+    """
+    Cosine similarity for embeddings that are already L2-normalized
+    (as returned by FaceService.detect_and_embed): reduces to a plain dot product.
+    """
+    if a is None or b is None:
+        return 0.0
+    assert abs(float(np.vdot(a, a)) - 1.0) < 1e-3 and abs(float(np.vdot(b, b)) - 1.0) < 1e-3, \
+        "cosine_similarity_unit expects unit-norm vectors"
+    if simsimd is not None:
+        return float(simsimd.dot(np.ascontiguousarray(a, dtype=np.float32),
+                                 np.ascontiguousarray(b, dtype=np.float32)))
+    return float(a @ b)
\ No newline at end of file
@@ -1,35 +1,53 @@
 import cv2
 import numpy as np
 
+# Long-edge size the selfie is downscaled to for the saturation/moire heuristics
+LIVENESS_MAX_SIDE = 512
+
+# Fitted so the Laplacian proxy tracks the old FFT high-frequency ratio
+HF_RATIO_EXPONENT = 0.19
+
 
 def liveness_heuristics(img_bgr: np.ndarray) -> float:
     """
     Very basic, non-robust heuristics that correlate loosely with live captures:
     - Sharpness (variance of Laplacian)
     - Color presence (saturation)
-    - Moiré/screen pattern penalty (FFT high-frequency bias)
+    - Moiré/screen pattern penalty (high-frequency energy bias)
     Returns a 0..1 score. This is NOT spoof-resistant; use proper anti-spoofing in production.
     """
-    # Sharpness
+    # Sharpness, at native resolution: Laplacian variance is resolution-dependent
+    # and the 150 normaliser was tuned on full-size captures. Downscaling first
+    # would make soft high-resolution selfies look sharp.
     gray = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2GRAY)
-    fm = cv2.Laplacian(gray, cv2.CV_64F).var()
+    lap = cv2.Laplacian(gray, cv2.CV_32F)  # float32 halves memory traffic vs CV_64F
+    fm = float(lap.var())
     sharp = min(1.0, fm / 150.0)  # normalize
 
+    # The remaining signals survive at ~512px; work on a downscaled copy
+    h, w = img_bgr.shape[:2]
+    if max(h, w) > LIVENESS_MAX_SIDE:
+        scale = LIVENESS_MAX_SIDE / float(max(h, w))
+        size = (max(1, int(w * scale)), max(1, int(h * scale)))
+        img_bgr = cv2.resize(img_bgr, size, interpolation=cv2.INTER_AREA)
+        gray = cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+
     # Saturation
-    hsv = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2HSV)
-    sat = hsv[..., 1]
-    sat_mean = sat.mean() / 255.0
-
-    # FFT-based moire penalty
-    # High HF energy relative to total could indicate screen recapture
-    f = np.fft.fft2(gray)
-    fshift = np.fft.fftshift(f)
-    magnitude = np.abs(fshift)
-    h, w = gray.shape
-    cy, cx = h // 2, w // 2
-    central = magnitude[cy - 15:cy + 15, cx - 15:cx + 15].sum() + 1e-6
-    total = magnitude.sum() + 1e-6
-    hf_ratio = 1.0 - (central / total)
+    # HSV saturation S = 255 * (max - min) / max, without computing hue
+    b, g, r = cv2.split(img_bgr)
+    mx = cv2.max(cv2.max(b, g), r)
+    mn = cv2.min(cv2.min(b, g), r)
+    sat = cv2.divide(cv2.subtract(mx, mn), mx, scale=255)  # 0 where max == 0, as in HSV
+    sat_mean = cv2.mean(sat)[0] / 255.0
+
+    # High-pass moire penalty
+    # High HF energy relative to overall brightness could indicate screen recapture.
+    # A 3x3 Laplacian is a cheap O(N) proxy for the FFT high-frequency band; the
+    # power curve maps it onto the scale of the former FFT ratio (1 - central/total).
+    hp = cv2.Laplacian(gray, cv2.CV_32F, ksize=3)
+    hf_energy = float(cv2.norm(hp, cv2.NORM_L1)) / hp.size  # mean |laplacian|
+    total = float(gray.mean()) + 1e-6
+    hf_ratio = min(1.0, (hf_energy / total) ** HF_RATIO_EXPONENT)
     moire_penalty = min(1.0, hf_ratio * 1.5)
 
     # Combine
@@ -1,22 +1,33 @@
+import asyncio
+import io
 import os
 import re
-import tempfile
 from dataclasses import dataclass
 from typing import Optional, Tuple
 
 import cv2
 import numpy as np
+import aiopytesseract
+import aiopytesseract.base_command
 import pytesseract
-from PIL import Image
+from aiopytesseract.exceptions import TesseractError
 from passporteye import read_mrz
 
 from app.utils.image import preprocess_for_ocr
 
-# Optional: allow overriding tesseract path via env var on Windows
+# Optional: allow overriding tesseract path via env var on Windows.
+# Set it for both wrappers: OCR uses aiopytesseract, passporteye (MRZ) uses pytesseract.
 TESS_CMD = os.getenv("TESSERACT_CMD")
 if TESS_CMD:
+    aiopytesseract.base_command.TESSERACT_CMD = TESS_CMD
     pytesseract.pytesseract.tesseract_cmd = TESS_CMD
 
+# Per-page Tesseract timeout in seconds
+TESS_TIMEOUT = float(os.getenv("TESSERACT_TIMEOUT", "20"))
+
+# Cap the number of concurrent Tesseract subprocesses across requests
+_OCR_SEMAPHORE = asyncio.Semaphore(os.cpu_count() or 1)
+
 
 @dataclass
 class ParsedFields:
@@ -37,65 +48,88 @@ DOCNUM_PATTERNS = [
     r"\b(\d{8,10})\b",
 ]
 
+# Compiled once at import; used in the per-page extraction loop
+_DOB_RES = [re.compile(p) for p in DOB_PATTERNS]
+_DOCNUM_RES = [re.compile(p) for p in DOCNUM_PATTERNS]
+_NAME_RE = re.compile(r"\b([A-Z]{2,}(?:\s+[A-Z]{2,}){1,3})\b")
+_NAT_RE = re.compile(r"\b(Nationality|Citizenship)\s*[:\-]?\s*([A-Z]{3,})\b", re.IGNORECASE)
+_EXP_RE = re.compile(r"(Expiry|Expires|Valid\s*Until)\s*[:\-]?\s*([0-9./-]{8,10})", re.IGNORECASE)
+_ADDR_RE = re.compile(r"(Address|Residence)\s*[:\-]?\s*(.+)$", re.IGNORECASE)
+_YMD_RE = re.compile(r"(\d{4})[-/\.](\d{2})[-/\.](\d{2})")
+_DMY_RE = re.compile(r"(\d{2})[-/\.](\d{2})[-/\.](\d{4})")
+
 
 def _normalize_dob(s: str) -> Optional[str]:
     s = s.strip()
-    m = re.match(r"(\d{4})[-/\.](\d{2})[-/\.](\d{2})", s)
+    m = _YMD_RE.match(s)
     if m:
         return f"{m.group(1)}-{m.group(2)}-{m.group(3)}"
-    m = re.match(r"(\d{2})[-/\.](\d{2})[-/\.](\d{4})", s)
+    m = _DMY_RE.match(s)
     if m:
         return f"{m.group(3)}-{m.group(2)}-{m.group(1)}"
     return None
 
 
-def extract_text_fields(id_front_bgr: np.ndarray, id_back_bgr: Optional[np.ndarray]) -> tuple[ParsedFields, float]:
-    # Simple OCR pipeline using Tesseract
+async def _ocr_page(img_bgr: np.ndarray) -> list:
+    pre = await asyncio.to_thread(preprocess_for_ocr, img_bgr)
+    ok, buf = cv2.imencode(".png", pre)
+    if not ok:
+        return []
+    try:
+        async with _OCR_SEMAPHORE:
+            return await aiopytesseract.image_to_data(buf.tobytes(), lang="eng", timeout=TESS_TIMEOUT)
+    except (TesseractError, asyncio.TimeoutError) as e:
+        # Log and treat the page as unreadable rather than failing the whole request
+        import sys
+        print("[OCR] tesseract failed:", e, file=sys.stderr)
+        return []
+
+
+async def extract_text_fields(id_front_bgr: np.ndarray, id_back_bgr: Optional[np.ndarray]) -> tuple[ParsedFields, float]:
+    # Simple OCR pipeline using Tesseract; front and back pages run concurrently
     fields = ParsedFields()
     confs = []
 
-    for img in [id_front_bgr, id_back_bgr]:
-        if img is None:
-            continue
-        pre = preprocess_for_ocr(img)
-        pil = Image.fromarray(pre)
-        data = pytesseract.image_to_data(pil, output_type=pytesseract.Output.DICT, lang="eng")
-        text = " ".join([w for w in data["text"] if w and w.strip()])
-        conf_vals = [int(c) for c in data.get("conf", []) if isinstance(c, str) and c.isdigit()]
+    pages = [img for img in [id_front_bgr, id_back_bgr] if img is not None]
+    results = await asyncio.gather(*(_ocr_page(img) for img in pages))
+
+    for data in results:
+        text = " ".join([d.text for d in data if d.text and d.text.strip()])
+        conf_vals = [d.conf for d in data if d.conf >= 0]
         if conf_vals:
             confs.append(max(0, min(100, sum(conf_vals) / len(conf_vals))) / 100.0)
 
         # Name: look for lines with uppercase words
-        candidates = re.findall(r"\b([A-Z]{2,}(?:\s+[A-Z]{2,}){1,3})\b", text)
+        candidates = _NAME_RE.findall(text)
         if candidates and not fields.full_name:
             fields.full_name = candidates[0].title()
 
         # DOB
-        for pat in DOB_PATTERNS:
-            m = re.search(pat, text)
+        for pat in _DOB_RES:
+            m = pat.search(text)
             if m and not fields.dob:
                 fields.dob = _normalize_dob(m.group(1))
                 break
 
         # Document number
-        for pat in DOCNUM_PATTERNS:
-            m = re.search(pat, text)
+        for pat in _DOCNUM_RES:
+            m = pat.search(text)
             if m and not fields.document_number:
                 fields.document_number = m.group(1)
                 break
 
         # Nationality
-        nat = re.search(r"\b(Nationality|Citizenship)\s*[:\-]?\s*([A-Z]{3,})\b", text, re.IGNORECASE)
+        nat = _NAT_RE.search(text)
         if nat and not fields.nationality:
             fields.nationality = nat.group(2).upper()
 
         # Expiry
-        exp = re.search(r"(Expiry|Expires|Valid\s*Until)\s*[:\-]?\s*([0-9./-]{8,10})", text, re.IGNORECASE)
+        exp = _EXP_RE.search(text)
         if exp and not fields.expiry_date:
             fields.expiry_date = _normalize_dob(exp.group(2)) or exp.group(2)
 
         # Address (very rough)
-        addr = re.search(r"(Address|Residence)\s*[:\-]?\s*(.+)$", text, re.IGNORECASE)
+        addr = _ADDR_RE.search(text)
         if addr and not fields.address:
             fields.address = addr.group(2).strip()
 
@@ -105,7 +139,7 @@ def extract_text_fields(id_front_bgr: np.ndarray, id_back_bgr: Optional[np.ndarr
 
 def try_mrz_parse(id_front_bgr: np.ndarray) -> ParsedFields:
     """
-    MRZ parsing with Windows-safe temp file handling and graceful failure.
+    MRZ parsing from an in-memory JPEG buffer with graceful failure.
     Set KYC_DISABLE_MRZ=1 to skip MRZ entirely (e.g., if deps conflict with NumPy 2.x).
     """
     if os.getenv("KYC_DISABLE_MRZ", "").strip().lower() in ("1", "true", "yes", "y"):
@@ -113,52 +147,41 @@ def try_mrz_parse(id_front_bgr: np.ndarray) -> ParsedFields:
 
     fields = ParsedFields()
 
-    # Prefer system temp dir; allow override via KYC_TMPDIR if needed
-    tmp_dir = os.getenv("KYC_TMPDIR", None)
-    fd, path = tempfile.mkstemp(suffix=".jpg", dir=tmp_dir)
-    os.close(fd)  # Important on Windows: release the handle before cv2.imwrite
+    ok, buf = cv2.imencode(".jpg", id_front_bgr)
+    if not ok:
+        return fields
 
     try:
-        ok = cv2.imwrite(path, id_front_bgr)
-        if not ok:
-            return fields
-
-        try:
-            mrz = read_mrz(path)
-        except Exception as e:
-            # Log and fall back to OCR-only without crashing the API
-            import sys, traceback
-            print("[MRZ] read_mrz failed:", e, file=sys.stderr)
-            traceback.print_exc()
-            return fields
-
-        if mrz is None:
-            return fields
-
-        mrz_data = mrz.to_dict()
-        surname = mrz_data.get("surname")
-        given = mrz_data.get("names")
-        if surname or given:
-            fields.full_name = " ".join([given or "", surname or ""]).strip().title()
-
-        dob = mrz_data.get("date_of_birth")
-        if dob and len(dob) == 6:
-            yy, mm, dd = dob[:2], dob[2:4], dob[4:]
-            century = "19" if int(yy) > 30 else "20"
-            fields.dob = f"{century}{yy}-{mm}-{dd}"
-
-        fields.document_number = mrz_data.get("number") or mrz_data.get("document_number")
-        fields.nationality = (mrz_data.get("nationality") or "").upper() or None
-
-        exp = mrz_data.get("expiration_date")
-        if exp and len(exp) == 6:
-            yy, mm, dd = exp[:2], exp[2:4], exp[4:]
-            century = "19" if int(yy) > 30 else "20"
-            fields.expiry_date = f"{century}{yy}-{mm}-{dd}"
+        mrz = read_mrz(io.BytesIO(buf.tobytes()))
+    except Exception as e:
+        # Log and fall back to OCR-only without crashing the API
+        import sys, traceback
+        print("[MRZ] read_mrz failed:", e, file=sys.stderr)
+        traceback.print_exc()
+        return fields
 
+    if mrz is None:
         return fields
-    finally:
-        try:
-            os.remove(path)
-        except OSError:
-            pass
\ No newline at end of file
+
+    mrz_data = mrz.to_dict()
+    surname = mrz_data.get("surname")
+    given = mrz_data.get("names")
+    if surname or given:
+        fields.full_name = " ".join([given or "", surname or ""]).strip().title()
+
+    dob = mrz_data.get("date_of_birth")
+    if dob and len(dob) == 6:
+        yy, mm, dd = dob[:2], dob[2:4], dob[4:]
+        century = "19" if int(yy) > 30 else "20"
+        fields.dob = f"{century}{yy}-{mm}-{dd}"
+
+    fields.document_number = mrz_data.get("number") or mrz_data.get("document_number")
+    fields.nationality = (mrz_data.get("nationality") or "").upper() or None
+
+    exp = mrz_data.get("expiration_date")
+    if exp and len(exp) == 6:
+        yy, mm, dd = exp[:2], exp[2:4], exp[4:]
+        century = "19" if int(yy) > 30 else "20"
+        fields.expiry_date = f"{century}{yy}-{mm}-{dd}"
+
+    return fields
\ No newline at end of file
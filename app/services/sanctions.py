@@ -1,15 +1,76 @@
-from typing import List, Optional
+import hashlib
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
 
-import requests
+import httpx
 
 from app.schemas import SanctionsMatch
 
+# Shared async client keeps the connection to the API alive between calls (lazy init)
+_client: Optional[httpx.AsyncClient] = None
 
-def query_opensanctions(name: str, birth_date: Optional[str], api_key: Optional[str], top_k: int = 5) -> List[SanctionsMatch]:
+# Small LRU of successful responses keyed on the query arguments.
+# Entries are (monotonic timestamp, results) and expire after the caller's TTL,
+# so lists updated upstream (e.g. newly sanctioned persons) are picked up.
+_CACHE_MAXSIZE = 1024
+_cache: "OrderedDict[tuple, Tuple[float, Tuple[SanctionsMatch, ...]]]" = OrderedDict()
+
+
+def _get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(timeout=20, http2=True)
+    return _client
+
+
+async def aclose_client() -> None:
+    """Close the shared HTTP client; called from the app lifespan on shutdown."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def _cache_key(name: str, birth_date: Optional[str], api_key: Optional[str], top_k: int) -> tuple:
+    # Don't keep the raw API key in memory as part of the key
+    key_hash = hashlib.sha256(api_key.encode("utf-8")).hexdigest() if api_key else None
+    return (name, birth_date, key_hash, top_k)
+
+
+async def query_opensanctions(
+    name: str,
+    birth_date: Optional[str],
+    api_key: Optional[str],
+    top_k: int = 5,
+    cache_ttl: float = 3 * 3600,
+) -> List[SanctionsMatch]:
     """
     Call OpenSanctions match API. Falls back gracefully on errors.
     Docs: https://www.opensanctions.org/docs/api/
+    Successful responses are cached per (name, birth_date, api_key, top_k)
+    for `cache_ttl` seconds; pass 0 to disable caching.
     """
+    key = _cache_key(name, birth_date, api_key, top_k)
+    now = time.monotonic()
+    cached = _cache.get(key)
+    if cached is not None:
+        stored_at, results = cached
+        if now - stored_at < cache_ttl:
+            _cache.move_to_end(key)
+            return list(results)
+        del _cache[key]
+
+    results = await _query_opensanctions(name, birth_date, api_key, top_k)
+    if cache_ttl <= 0:
+        return list(results)
+    _cache[key] = (now, results)
+    if len(_cache) > _CACHE_MAXSIZE:
+        _cache.popitem(last=False)
+    return list(results)
+
+
+async def _query_opensanctions(name: str, birth_date: Optional[str], api_key: Optional[str], top_k: int) -> Tuple[SanctionsMatch, ...]:
     headers = {"Accept": "application/json"}
     if api_key:
         headers["Authorization"] = f"ApiKey {api_key}"
@@ -25,7 +86,7 @@ def query_opensanctions(name: str, birth_date: Optional[str], api_key: Optional[
 
     # POST /match
     url = "https://api.opensanctions.org/match"
-    resp = requests.post(url, json=payload, headers=headers, timeout=20)
+    resp = await _get_client().post(url, json=payload, headers=headers)
     resp.raise_for_status()
     data = resp.json()
 
@@ -45,4 +106,4 @@ def query_opensanctions(name: str, birth_date: Optional[str], api_key: Optional[
 
     # Sort by score desc if present
     results.sort(key=lambda m: (m.score or 0.0), reverse=True)
-    return results
\ No newline at end of file
+    return tuple(results)
\ No newline at end of file
@@ -0,0 +1,18 @@
+"""
+Optional Numba JIT. When numba is not installed, ``njit`` is a no-op
+decorator and the decorated functions run as plain Python.
+"""
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:  # pragma: no cover
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        # Support both @njit and @njit(...)
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+
+        def _decorator(func):
+            return func
+        return _decorator
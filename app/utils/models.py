@@ -1,4 +1,5 @@
 import os
+import shutil
 from typing import Iterable, List, Set, Union
 
 import requests
@@ -48,37 +49,44 @@ def ensure_model(file_name: str, urls: Union[str, Iterable[str]], directory: str
         if url in attempted:
             continue
         attempted.add(url)
+        tmp_path = path + ".part"
         try:
             with requests.get(url, stream=True, timeout=90) as r:
                 r.raise_for_status()
-                data = r.content
-            if not data:
-                errors.append(f"Downloaded empty response from {url}")
-                continue
-
-            if len(data) < 1024 and _looks_like_git_lfs_pointer(data):
-                media_url = _derive_media_url(url)
-                if media_url and media_url not in attempted and media_url not in candidates:
-                    candidates.insert(0, media_url)
-                    errors.append(
-                        "Encountered Git LFS pointer; retrying via media URL: "
-                        + media_url
-                    )
+                r.raw.decode_content = True
+                # Peek at the head to detect empty responses / Git LFS pointers
+                head = r.raw.read(1024)
+                if not head:
+                    errors.append(f"Downloaded empty response from {url}")
                     continue
 
-            with open(path, "wb") as f:
-                f.write(data)
+                if len(head) < 1024 and _looks_like_git_lfs_pointer(head):
+                    media_url = _derive_media_url(url)
+                    if media_url and media_url not in attempted and media_url not in candidates:
+                        candidates.insert(0, media_url)
+                        errors.append(
+                            "Encountered Git LFS pointer; retrying via media URL: "
+                            + media_url
+                        )
+                        continue
+
+                # Stream the rest straight to disk instead of buffering the whole model
+                with open(tmp_path, "wb") as f:
+                    f.write(head)
+                    shutil.copyfileobj(r.raw, f, length=1 << 20)
 
-            if os.path.getsize(path) < 1024:  # too small to be a real ONNX file
+            if os.path.getsize(tmp_path) < 1024:  # too small to be a real ONNX file
                 errors.append(f"Downloaded file too small from {url}")
-                try:
-                    os.remove(path)
-                except OSError:
-                    pass
+                os.remove(tmp_path)
                 continue
+            os.replace(tmp_path, path)
             return path
         except Exception as e:
             errors.append(f"{url} -> {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
 
     msg = (
         f"Could not download model '{file_name}'. Tried:\n  - "